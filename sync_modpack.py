@@ -1,15 +1,26 @@
 import argparse
+import hashlib
 import json
-import mimetypes
+import os
 import shutil
 import subprocess
 import sys
-import tempfile
+import threading
 import zipfile
+import zlib
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Optional, Union
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CHUNK_SIZE = 1024 * 1024
+MAX_WORKERS = 16
+
 
 def parse_args():
     parser = argparse.ArgumentParser(
@@ -21,6 +32,12 @@ def parse_args():
     parser.add_argument(
         "--api", required=True, help="URL de la API de Modrinth para el modpack"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=MAX_WORKERS,
+        help=f"Descargas simultáneas (por defecto {MAX_WORKERS})",
+    )
     return parser.parse_args()
 
 
@@ -33,35 +50,68 @@ def get_or_install_requests():
     return requests
 
 
-def guess_type(name):
-    t, _ = mimetypes.guess_type(name)
-    return t or "application/octet-stream"
+def json_loads(data: bytes):
+    """Decodifica JSON con orjson si está instalado (más rápido) o con json"""
+    return orjson.loads(data) if orjson else json.loads(data)
 
 
-def read_mrpack(path: Union[str, Path]):
-    path = Path(path) if isinstance(path, str) else path
+def create_session():
+    """Crea una sesión HTTP que reutiliza conexiones entre descargas"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=8, pool_maxsize=MAX_WORKERS, max_retries=3
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
 
-    result = {"modrinth.index.json": [], "overrides": []}
+@contextmanager
+def open_mrpack(path: Union[str, Path]):
+    """Abre el .mrpack y entrega su índice, el ZipFile abierto y sus overrides.
+
+    Los overrides se entregan como ZipInfo (sin leer su contenido) para extraerlos
+    después directamente desde el mismo ZipFile.
+    """
     with zipfile.ZipFile(path, "r") as z:
-        namelist = z.namelist()
-
-        # --- 1. Extraer metadatos del índice ---
-        if "modrinth.index.json" in namelist:
-            with z.open("modrinth.index.json") as f:
-                index_data = json.load(f)
-                result["modrinth.index.json"] = index_data
-
-        # --- 2. Archivos incrustados (overrides/, etc.) ---
-        for name in namelist:
-            if name.startswith("overrides/"):
-                result["overrides"].append(
-                    {
-                        "path": name.removeprefix("overrides/"),
-                        "content": z.read(name),
-                    }
-                )
+        index_data = json_loads(z.read("modrinth.index.json"))
+        overrides = [
+            info
+            for info in z.infolist()
+            if info.filename.startswith("overrides/") and not info.is_dir()
+        ]
+        yield index_data, z, overrides
+
+
+def get_unchanged_overrides(
+    previous_mrpack: Optional[Path], overrides: list, base_folder: Path
+) -> set:
+    """Devuelve los overrides que no cambiaron respecto al .mrpack anterior.
+
+    Un override se considera sin cambios si tiene el mismo CRC y tamaño que en el
+    .mrpack anterior y el archivo en disco sigue teniendo ese tamaño y ese CRC (si
+    se editó, se vuelve a aplicar).
+    """
+    if previous_mrpack is None:
+        return set()
 
-    return result
+    try:
+        with zipfile.ZipFile(previous_mrpack, "r") as z:
+            previous = {i.filename: (i.CRC, i.file_size) for i in z.infolist()}
+    except zipfile.BadZipFile:
+        return set()
+
+    unchanged = set()
+    for info in overrides:
+        if previous.get(info.filename) != (info.CRC, info.file_size):
+            continue
+        path = base_folder / info.filename.removeprefix("overrides/")
+        try:
+            if path.stat().st_size == info.file_size and crc32_file(path) == info.CRC:
+                unchanged.add(info.filename)
+        except FileNotFoundError:
+            pass
+    return unchanged
 
 
 def has_last_modpack_version(last_version: str):
@@ -71,10 +121,7 @@ def has_last_modpack_version(last_version: str):
         return False
 
     # Comprobar si el archivo .mrpack corresponde a la última versión
-    for file in list(MODPACKS_FOLDER.glob("*.mrpack")):
-        if last_version in file.name:
-            return True
-    return False
+    return any(last_version in file.name for file in MODPACKS_FOLDER.glob("*.mrpack"))
 
 
 def get_last_modpack_version() -> Optional[Path]:
@@ -86,143 +133,447 @@ def get_last_modpack_version() -> Optional[Path]:
     if not mrpack_files:
         return None
 
-    latest_mrpack = max(mrpack_files, key=lambda f: f.stat().st_mtime)
-    return MODPACKS_FOLDER / latest_mrpack
+    return max(mrpack_files, key=lambda f: f.stat().st_mtime)
 
 
-def download_modpack(version_url: str, output_path: Path):
+def preallocate(f, size: int):
+    """Reserva `size` bytes en disco para el archivo antes de escribirlo"""
+    try:
+        if hasattr(os, "posix_fallocate"):
+            os.posix_fallocate(f.fileno(), 0, size)
+        else:
+            f.truncate(size)
+    except OSError:
+        pass  # El sistema de archivos no lo soporta: se escribe sin reservar
+
+
+def download_file(
+    url: str, path: Path, session, offset: int = 0, filesize: Optional[int] = None
+) -> bool:
+    """Descarga `url` en `path` por bloques.
+
+    Si `offset` > 0 pide solo los bytes restantes (cabecera Range) y los escribe a
+    partir de esa posición. Si se conoce `filesize`, reserva el espacio del archivo
+    antes de escribir. Devuelve True si el servidor aceptó reanudar la descarga.
+    """
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    with session.get(url, headers=headers, stream=True, timeout=30) as response:
+        response.raise_for_status()
+        resumed = response.status_code == 206
+        with open(path, "r+b" if resumed else "wb") as f:
+            if filesize:
+                preallocate(f, filesize)
+            f.seek(offset if resumed else 0)
+            try:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+            finally:
+                # Descartar el espacio reservado que no se llegó a escribir, para
+                # que una descarga interrumpida no aparente estar completa
+                f.truncate()
+    return resumed
+
+
+def download_modpack(
+    version_url: str,
+    output_path: Path,
+    session,
+    filesize: int,
+    sha1: str,
+):
     """Descarga el archivo .mrpack de la version especificada"""
-    response = requests.get(version_url)
-
-    if response.status_code == 200:
-        with open(output_path, "wb") as f:
-            f.write(response.content)
-        print(f"modpacks descargado en: {output_path}")
+    offset = output_path.stat().st_size if output_path.exists() else 0
+    if offset == filesize and is_valid_file(output_path, filesize, sha1):
+        # Descargado por completo en una ejecución anterior que se interrumpió o en
+        # la que falló algún archivo del modpack
+        print(f"modpacks ya descargado en: {output_path}")
         return output_path
-    else:
-        print(f"Error al descargar el modpacks: {response.status_code}")
+    if offset >= filesize:
+        offset = 0
+
+    try:
+        resumed = download_file(version_url, output_path, session, offset, filesize)
+        if resumed and not is_valid_file(output_path, filesize, sha1):
+            download_file(version_url, output_path, session, filesize=filesize)
+    except requests.RequestException as e:
+        print(f"Error al descargar el modpacks: {e}")
+        return None
+
+    if not is_valid_file(output_path, filesize, sha1):
+        output_path.unlink(missing_ok=True)
+        print("Error al descargar el modpacks: el sha1 no coincide")
         return None
 
+    print(f"modpacks descargado en: {output_path}")
+    return output_path
+
 
-def fetch_modpack_versions(url):
-    response = requests.get(url)
+def fetch_modpack_versions(url, session):
+    response = session.get(url, timeout=30)
     if response.status_code == 200:
-        versions = response.json()
+        versions = json_loads(response.content)
         return versions
     else:
         print(f"Error al obtener versiones: {response.status_code}")
         return None
 
 
+def sha1_file(path: Path) -> str:
+    """Calcula el sha1 de un archivo leyéndolo por bloques"""
+    with open(path, "rb") as f:
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "sha1").hexdigest()
+        digest = hashlib.sha1()
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+
+def crc32_file(path: Path) -> int:
+    """Calcula el CRC-32 de un archivo leyéndolo por bloques"""
+    crc = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def is_valid_file(path: Path, filesize: int, sha1: str) -> bool:
+    """Comprueba que el archivo tenga el tamaño y el sha1 esperados"""
+    return path.stat().st_size == filesize and sha1_file(path) == sha1
+
+
 def sync_mods_folder(files_from_mrpack):
     """Sincroniza la carpeta /mods con los archivos del modpack.
 
-    - Conserva mods idénticos (mismo nombre y tamaño)
-    - Elimina mods que ya no existen en el .mrpack
-    - Devuelve lista de mods que deben descargarse
+    - Conserva mods idénticos (mismo nombre y sha1)
+    - Devuelve lista de mods que deben descargarse y el tamaño de sus descargas
+      parciales (.part) en /mods
+    - Devuelve los mods (y descargas parciales) que ya no existen en el .mrpack,
+      para eliminarlos junto con las descargas
     """
     folder_mods = MINECRAFT_FOLDER / "mods"
     folder_mods.mkdir(exist_ok=True)
 
-    # Mapear mods esperados (por nombre -> tamaño)
-    expected = {Path(f["path"]).name: f["fileSize"] for f in files_from_mrpack}
+    # Mapear mods esperados (por nombre -> tamaño y sha1). Las rutas del índice
+    # siempre usan "/", así que basta con cortar la cadena para obtener el nombre
+    names = [f["path"].rsplit("/", 1)[-1] for f in files_from_mrpack]
+    expected = {
+        name: (f["fileSize"], f["hashes"]["sha1"])
+        for name, f in zip(names, files_from_mrpack)
+    }
+
+    # Mods existentes en disco y descargas parciales, en un solo escaneo
+    existing = {}
+    partials = {}
+    with os.scandir(folder_mods) as entries:
+        for entry in entries:
+            if entry.name.endswith(".jar"):
+                existing[entry.name] = entry.stat().st_size
+            elif entry.name.endswith(".jar.part"):
+                partials[entry.name.removesuffix(".part")] = entry.stat().st_size
+
+    expected_names, existing_names = expected.keys(), existing.keys()
+    common_names = expected_names & existing_names
+
+    # --- Calcular en paralelo el sha1 de los mods con el tamaño esperado ---
+    candidates = [name for name in common_names if existing[name] == expected[name][0]]
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        hashes = dict(
+            zip(
+                candidates,
+                executor.map(sha1_file, (folder_mods / name for name in candidates)),
+            )
+        )
+
+    # --- Detectar mods sobrantes, faltantes o distintos ---
+    to_delete = existing_names - expected_names
+    to_download = (expected_names - existing_names) | {
+        name for name in common_names if hashes.get(name) != expected[name][1]
+    }
+
+    # --- Mostrar resumen ---
+    print(f"\n- {len(to_download)} mods necesitan descargarse.")
+    print(f"- {len(expected) - len(to_download)} mods conservados.\n")
+
+    # Devolver lista de archivos que hay que descargar
+    files = []
+    partial_sizes = {}
+    for name, f in zip(names, files_from_mrpack):
+        if name in to_download:
+            files.append(f)
+            if f["path"] == f"mods/{name}":
+                partial_sizes[f["path"]] = partials.get(name, 0)
+    stale_mods = [folder_mods / name for name in sorted(to_delete)]
+    stale_mods += [
+        folder_mods / (name + ".part")
+        for name in sorted(partials.keys() - to_download)
+    ]
+    return files, partial_sizes, stale_mods
 
-    # Mods existentes en disco
-    existing = {f.name: f.stat().st_size for f in folder_mods.glob("*.jar")}
 
-    to_delete = []
-    to_download = []
+def delete_mod(path: Path):
+    """Elimina un mod sobrante."""
+    path.unlink(missing_ok=True)
+    return True, f"🗑️ Eliminado mod sobrante: {path.name}"
 
-    # --- Detectar mods sobrantes ---
-    for name in existing:
-        if name not in expected:
-            to_delete.append(name)
 
-    # --- Detectar mods faltantes o distintos ---
-    for name, size in expected.items():
-        if name not in existing or existing[name] != size:
-            to_download.append(name)
+def get_cache_path(cache_folder: Path, sha1: str) -> Path:
+    """Ruta de un archivo en la caché de mods (direccionada por su sha1)"""
+    return cache_folder / sha1[:2] / sha1
 
-    # --- Eliminar mods sobrantes ---
-    for name in to_delete:
-        path = folder_mods / name
-        path.unlink(missing_ok=True)
-        print(f"🗑️ Eliminado mod sobrante: {name}")
 
-    # --- Mostrar resumen ---
-    print(f"\n- {len(to_download)} mods necesitan descargarse.")
-    print(f"- {len(existing) - len(to_delete)} mods conservados.\n")
+def prune_cache(cache_folder: Path, keep: set) -> int:
+    """Elimina de la caché los archivos cuyo sha1 no está en `keep`.
+
+    Devuelve cuántos archivos se eliminaron.
+    """
+    if not cache_folder.exists():
+        return 0
+
+    removed = 0
+    with os.scandir(cache_folder) as subfolders:
+        for subfolder in subfolders:
+            if not subfolder.is_dir():
+                continue
+            with os.scandir(subfolder.path) as entries:
+                for entry in entries:
+                    if entry.name not in keep:
+                        os.unlink(entry.path)
+                        removed += 1
+            try:
+                os.rmdir(subfolder.path)
+            except OSError:
+                pass  # La carpeta aún tiene archivos del modpack actual
+    return removed
+
+
+def link_file(src: Path, dst: Path):
+    """Enlaza src en dst (hardlink) o lo copia si no es posible, reemplazando dst"""
+    tmp_path = dst.with_name(dst.name + ".part")
+    tmp_path.unlink(missing_ok=True)
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dst)
 
-    # Devolver lista de archivos que hay que descargar
-    return [f for f in files_from_mrpack if Path(f["path"]).name in to_download]
 
+def download_mod(
+    file: dict,
+    base_folder: Path,
+    cache_folder: Path,
+    session,
+    partial_size: Optional[int] = None,
+):
+    """Descarga un solo mod, reanudando la descarga parcial (.part) si existe.
 
-def download_mod(file: dict, base_folder: Path):
-    """Descarga un solo mod."""
+    Devuelve (éxito, mensaje); los errores no se lanzan, se informan en el mensaje.
+
+    Si el mod ya está en la caché (por sha1) se enlaza desde ella sin descargarlo;
+    si no, se descarga primero en la caché y luego se enlaza en su ruta.
+
+    `partial_size` es el tamaño del .part ya conocido por sync_mods_folder; si se
+    indica, el mod ya fue verificado allí y no se vuelve a consultar el disco.
+    """
     path = base_folder / file["path"]
+    part_path = path.with_name(path.name + ".part")
     url = file["downloads"][0]
     filesize = file["fileSize"]
+    sha1 = file["hashes"]["sha1"]
+    cache_path = get_cache_path(cache_folder, sha1)
 
-    if path.exists() and path.stat().st_size == filesize:
-        return f"✔ {file['path']} (ya actualizado)"
+    if partial_size is None:
+        if path.exists() and is_valid_file(path, filesize, sha1):
+            return True, f"✔ {file['path']} (ya actualizado)"
+        partial_size = part_path.stat().st_size if part_path.exists() else 0
 
-    path.parent.mkdir(parents=True, exist_ok=True)
     try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        with open(path, "wb") as f:
-            f.write(response.content)
-        return f"✔ {file['path']} (descargado)"
+        if cache_path.exists():
+            if is_valid_file(cache_path, filesize, sha1):
+                link_file(cache_path, path)
+                return True, f"✔ {file['path']} (desde caché)"
+            # La entrada de la caché se corrompió (p. ej. editando el enlace en su
+            # sitio): se descarta y se vuelve a descargar
+            cache_path.unlink(missing_ok=True)
+
+        offset = partial_size if partial_size < filesize else 0
+        resumed = download_file(url, part_path, session, offset, filesize)
+        if resumed and not is_valid_file(part_path, filesize, sha1):
+            # Lo descargado antes no corresponde a este archivo: empezar de cero
+            resumed = download_file(url, part_path, session, filesize=filesize)
+
+        if not is_valid_file(part_path, filesize, sha1):
+            part_path.unlink(missing_ok=True)
+            return False, f"⚠️ Error en {file['path']}: el sha1 no coincide"
+
+        try:
+            os.replace(part_path, cache_path)
+        except OSError:
+            # /mods está en otro volumen que la caché (p. ej. un enlace simbólico)
+            shutil.move(part_path, cache_path)
+        link_file(cache_path, path)
+        status = "descarga reanudada" if resumed else "descargado"
+        return True, f"✔ {file['path']} ({status})"
     except Exception as e:
-        return f"⚠️ Error en {file['path']}: {e}"
+        return False, f"⚠️ Error en {file['path']}: {e}"
+
+
+def create_parent_folders(paths):
+    """Crea una sola vez cada carpeta padre de las rutas indicadas"""
+    for parent in {path.parent for path in paths}:
+        parent.mkdir(parents=True, exist_ok=True)
+
+
+def extract_override(
+    z: zipfile.ZipFile, lock: threading.Lock, info: zipfile.ZipInfo, base_folder: Path
+):
+    """Extrae un override del .mrpack directamente a disco.
+
+    Todos los hilos comparten el mismo ZipFile: abrir y cerrar una entrada no es
+    seguro entre hilos, así que se hace bajo `lock`; la descompresión y la
+    escritura sí van en paralelo.
+    """
+    relative_path = info.filename.removeprefix("overrides/")
+    path = base_folder / relative_path
+    with lock:
+        src = z.open(info)
+    try:
+        with open(path, "wb") as dst:
+            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+    finally:
+        with lock:
+            src.close()
+    return True, f"✔ {relative_path} (override aplicado)"
+
+
+def print_results(futures, batch_size: int = 16) -> int:
+    """Muestra el resultado de cada tarea según termina, escribiendo por lotes.
+
+    Cada tarea devuelve (éxito, mensaje). Devuelve cuántas tareas fallaron.
+    """
+    lines = []
+    failed = 0
+
+    def flush():
+        if lines:
+            sys.stdout.write("\n".join(lines) + "\n")
+            sys.stdout.flush()
+            lines.clear()
+
+    try:
+        for future in as_completed(futures):
+            ok, message = future.result()
+            lines.append(message)
+            failed += not ok
+            if len(lines) >= batch_size:
+                flush()
+    finally:
+        flush()
+    return failed
 
 
 def main():
-    modpack_versions = fetch_modpack_versions(MODPACK_API_URL)
+    modpack_versions = fetch_modpack_versions(MODPACK_API_URL, SESSION)
     if not modpack_versions:
-        return
+        return 1
 
-    last_version_filename = modpack_versions[0]["files"][0]["filename"]
-    last_version_url = modpack_versions[0]["files"][0]["url"]
+    last_version_file = modpack_versions[0]["files"][0]
+    last_version_filename = last_version_file["filename"]
+    last_version_url = last_version_file["url"]
+    last_version_size = last_version_file["size"]
+    last_version_sha1 = last_version_file["hashes"]["sha1"]
 
     if not has_last_modpack_version(last_version_filename):
         print(f"Descargando la versión {last_version_filename} del modpack...")
 
-        folder_temp = tempfile.TemporaryDirectory()
-        mrpack_path = Path(folder_temp.name) / last_version_filename
-        download_modpack(last_version_url, mrpack_path)
+        # Se descarga junto a los demás .mrpack con sufijo .part y solo se renombra
+        # si toda la sincronización termina sin errores: si se interrumpe o falla
+        # algún archivo, la próxima ejecución reanuda o reutiliza el .part
+        MODPACKS_FOLDER.mkdir(parents=True, exist_ok=True)
+        mrpack_path = MODPACKS_FOLDER / (last_version_filename + ".part")
+        if not download_modpack(
+            last_version_url,
+            mrpack_path,
+            SESSION,
+            last_version_size,
+            last_version_sha1,
+        ):
+            return 1
 
         print("Leyendo el contenido del modpack descargado...")
-        data = read_mrpack(mrpack_path)
-
-        print("\nDescargando mods en paralelo...\n")
-        files_from_pack = data["modrinth.index.json"]["files"]  # type: ignore
-        files_to_download = sync_mods_folder(files_from_pack)
-
-        # --- Descargas concurrentes ---
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            futures = [
-                executor.submit(download_mod, file, MINECRAFT_FOLDER)
-                for file in files_to_download
-            ]
-            for future in as_completed(futures):
-                print(future.result())
-
-        # --- Sobrescribir overrides ---
-        print("\nAplicando overrides...")
-        for file in data["overrides"]:
-            path = MINECRAFT_FOLDER / file["path"]
-            path.parent.mkdir(parents=True, exist_ok=True)
-            with open(path, "wb") as f:
-                content = file["content"]
-                if isinstance(content, str):
-                    content = content.encode("utf-8", errors="ignore")
-                f.write(content)
-            print(f"✔ {file['path']} (override aplicado)")
+        with open_mrpack(mrpack_path) as (index_data, z, overrides):
+            print("\nDescargando mods en paralelo...\n")
+            files_from_pack = index_data["files"]
+            files_to_download, partial_sizes, stale_mods = sync_mods_folder(
+                files_from_pack
+            )
+
+            # --- Descargas concurrentes (y borrado de mods sobrantes) ---
+            create_parent_folders(
+                MINECRAFT_FOLDER / f["path"] for f in files_to_download
+            )
+            create_parent_folders(
+                get_cache_path(CACHE_FOLDER, f["hashes"]["sha1"])
+                for f in files_to_download
+            )
+            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+                futures = [executor.submit(delete_mod, path) for path in stale_mods]
+                futures += [
+                    executor.submit(
+                        download_mod,
+                        file,
+                        MINECRAFT_FOLDER,
+                        CACHE_FOLDER,
+                        SESSION,
+                        partial_sizes.get(file["path"]),
+                    )
+                    for file in files_to_download
+                ]
+                failed = print_results(futures)
+
+                # --- Limpiar la caché: solo se conservan los archivos del índice ---
+                pruned = prune_cache(
+                    CACHE_FOLDER, {f["hashes"]["sha1"] for f in files_from_pack}
+                )
+                if pruned:
+                    print(f"\n🗑️ {pruned} archivos eliminados de la caché.")
+
+                # --- Sobrescribir overrides (después de los mods, en paralelo) ---
+                print("\nAplicando overrides...")
+                unchanged = get_unchanged_overrides(
+                    get_last_modpack_version(), overrides, MINECRAFT_FOLDER
+                )
+                overrides = [i for i in overrides if i.filename not in unchanged]
+                print(f"- {len(unchanged)} overrides sin cambios.\n")
+
+                override_paths = [
+                    MINECRAFT_FOLDER / info.filename.removeprefix("overrides/")
+                    for info in overrides
+                ]
+                create_parent_folders(override_paths)
+
+                # Los archivos del índice pueden ser enlaces a la caché: se quitan
+                # antes de escribir el override encima para no modificar la caché
+                index_paths = {MINECRAFT_FOLDER / f["path"] for f in files_from_pack}
+                for path in index_paths.intersection(override_paths):
+                    path.unlink(missing_ok=True)
+
+                lock = threading.Lock()
+                futures = [
+                    executor.submit(extract_override, z, lock, info, MINECRAFT_FOLDER)
+                    for info in overrides
+                ]
+                failed += print_results(futures)
+
+        if failed:
+            # No se da por instalada la versión: la próxima ejecución repite la
+            # sincronización y reanuda las descargas parciales
+            print(f"\n❌ {failed} archivos no se pudieron actualizar.")
+            return 1
 
         print("\n✅ Modpack actualizado correctamente.")
-        MODPACKS_FOLDER.mkdir(parents=True, exist_ok=True)
-        shutil.move(mrpack_path, MODPACKS_FOLDER / last_version_filename)
+        os.replace(mrpack_path, MODPACKS_FOLDER / last_version_filename)
 
     else:
         print("\n✅ Modpack ya ha sido actualizado.")
@@ -232,7 +583,10 @@ if __name__ == "__main__":
     args = parse_args()
     MINECRAFT_FOLDER = Path(args.minecraft)
     MODPACK_API_URL = args.api
+    MAX_WORKERS = max(1, args.workers)
     MODPACKS_FOLDER = MINECRAFT_FOLDER / "modpacks"
+    CACHE_FOLDER = MODPACKS_FOLDER / ".cache"
     requests = get_or_install_requests()
+    SESSION = create_session()
 
-    main()
+    sys.exit(main())